@@ -10,7 +10,8 @@
 # Expects one FBX/GLB per exercise id in --src, named <id>.fbx or <id>.glb
 # For static poses (e.g., plank), you can also provide a .blend with an Action named 'Loop'
 #
-import bpy, sys, os, math, argparse
+import bpy, sys, os, math, argparse, subprocess
+import numpy as np
 
 # ---------------- CLI ----------------
 argv = sys.argv
@@ -27,11 +28,54 @@ args = ap.parse_args(argv)
 
 os.makedirs(args.out, exist_ok=True)
 
+# ---------------- Asset index ----------------
+# Lower value wins when an id exists in several formats
+ASSET_EXT_PREFERENCE = {".fbx": 0, ".glb": 1, ".gltf": 2, ".blend": 3}
+
+def index_assets(src_dir):
+    # Single directory scan instead of 4 stat probes per exercise id
+    index = {}
+    for entry in os.scandir(src_dir):
+        stem, ext = os.path.splitext(entry.name)
+        pref = ASSET_EXT_PREFERENCE.get(ext.lower())
+        if pref is None:
+            continue
+        cur = index.get(stem)
+        if cur is None or pref < cur[0]:
+            index[stem] = (pref, entry.path)
+    return index
+
+ASSETS = index_assets(args.src)
+
+# ---------------- Asset cache ----------------
+# One-time FBX/GLB -> .blend conversion under <src>/.cache. Blender's native
+# loader is far faster than the interchange parsers, so re-runs of the batch
+# skip the FBX/GLTF import path entirely.
+CACHE_DIR = os.path.join(args.src, ".cache")
+
+def build_asset_cache(ids):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    for ex_id in ids:
+        src = ASSETS.get(ex_id, (None, None))[1]
+        if not src or src.endswith(".blend"):
+            continue
+        cache_path = os.path.join(CACHE_DIR, ex_id + ".blend")
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(src):
+            continue
+        bpy.ops.wm.read_factory_settings(use_empty=True)
+        if src.endswith(".fbx"):
+            bpy.ops.import_scene.fbx(filepath=src, automatic_bone_orientation=True)
+        else:
+            bpy.ops.import_scene.gltf(filepath=src)
+        bpy.ops.wm.save_as_mainfile(filepath=cache_path, compress=True)
+
+build_asset_cache(args.ids)
+
 # ---------------- Scene setup ----------------
 bpy.ops.wm.read_factory_settings(use_empty=True)
 scene = bpy.context.scene
 scene.render.engine = 'BLENDER_EEVEE'
-scene.eevee.taa_render_samples = 32
+scene.eevee.taa_render_samples = 16  # preview clips; EEVEE sample cost is linear
 scene.eevee.use_bloom = False
 scene.eevee.use_gtao = True
 scene.eevee.use_ssr = False
@@ -78,29 +122,56 @@ def position_camera(kind="standing", aspect="square"):
         bpy.context.scene.render.resolution_x = 1920
         bpy.context.scene.render.resolution_y = 1080
 
-# Lights
+# Lights: (name, location, rotation_euler in radians, power, size)
+LIGHT_SPECS = (
+    ("Key",  (3, -3, 3),    (-0.6109, 0.0, 0.6109),  1500, 5),  # -35/35 deg
+    ("Fill", (-3, -3, 2.5), (-0.4363, 0.0, -0.6109), 800, 5),   # -25/-35 deg
+    ("Rim",  (0, 3, 2.5),   (-2.7925, 0.0, 0.0),     600, 3),   # -160 deg
+)
+
 def add_area(name, loc, rot, power=1200, size=5):
-    bpy.ops.object.light_add(type='AREA', location=loc, rotation=rot)
-    L = bpy.context.active_object
-    L.name = name
-    L.data.energy = power
-    L.data.shape = 'RECTANGLE'
-    L.data.size = size
-    L.data.size_y = size
-    return L
-
-add_area("Key", (3,-3,3), (math.radians(-35),0,math.radians(35)), power=1500, size=5)
-add_area("Fill", (-3,-3,2.5), (math.radians(-25),0,math.radians(-35)), power=800, size=5)
-add_area("Rim", (0,3,2.5), (math.radians(-160),0,0), power=600, size=3)
+    # Low-level datablock creation; bpy.ops.object.light_add pushes a full
+    # context/undo step per call.
+    light = bpy.data.lights.new(name, 'AREA')
+    light.energy = power
+    light.shape = 'RECTANGLE'
+    light.size = size
+    light.size_y = size
+    obj = bpy.data.objects.new(name, light)
+    obj.location = loc
+    obj.rotation_euler = rot
+    bpy.context.collection.objects.link(obj)
+    return obj
+
+for spec in LIGHT_SPECS:
+    add_area(*spec)
 
 # Render settings
 scene.render.image_settings.file_format = 'FFMPEG'
 scene.render.ffmpeg.format = 'MPEG4'
 scene.render.ffmpeg.codec = 'H264'
-scene.render.ffmpeg.constant_rate_factor = 'LOW'
-scene.render.ffmpeg.ffmpeg_preset = 'GOOD'
+scene.render.ffmpeg.constant_rate_factor = 'MEDIUM'  # ~CRF 23; plenty for dark preview clips
+scene.render.ffmpeg.ffmpeg_preset = 'REALTIME'
 scene.render.ffmpeg.gopsize = args.fps
+scene.render.ffmpeg.use_max_b_frames = True
+scene.render.ffmpeg.max_b_frames = 2
+scene.render.ffmpeg.use_autosplit = False
+scene.render.ffmpeg.use_lossless_output = False
 scene.render.use_sequencer = False
+# Reuse depsgraph/BVH across the three aspect renders of the same scene
+scene.render.use_persistent_data = True
+
+# The scene built above (world/ground/lights/camera/render settings) is the
+# template; each exercise renders in a cheap copy of it.
+template_scene = scene
+
+def remux_faststart(path):
+    # Move the moov atom to the front so web playback can start before the
+    # whole file downloads; stream copy only, no re-encode.
+    tmp = path + ".tmp.mp4"
+    subprocess.run(["ffmpeg", "-y", "-i", path, "-c", "copy",
+                    "-movflags", "+faststart", tmp], check=True)
+    os.replace(tmp, path)
 
 def import_asset(path):
     ext = os.path.splitext(path)[1].lower()
@@ -109,11 +180,24 @@ def import_asset(path):
     elif ext == ".glb" or ext == ".gltf":
         bpy.ops.import_scene.gltf(filepath=path)
     elif ext == ".blend":
-        # Append action/collection
+        # Append from the native .blend (author-provided or cached convert);
+        # appended data stays local so actions remain editable for rescaling
         with bpy.data.libraries.load(path, link=False) as (data_from, data_to):
-            data_to.collections = [name for name in data_from.collections if name == "Collection"]
+            if "Collection" in data_from.collections:
+                data_to.collections = ["Collection"]
+            else:
+                # Cached conversions save straight into the master collection
+                data_to.objects = list(data_from.objects)
+        new_objs = []
         for col in data_to.collections:
             bpy.context.scene.collection.children.link(col)
+            new_objs.extend(col.all_objects)
+        for obj in data_to.objects:
+            if obj is not None:
+                bpy.context.scene.collection.objects.link(obj)
+                new_objs.append(obj)
+        rigs = [o for o in new_objs if o.type == 'ARMATURE']
+        return rigs[0] if rigs else None
     else:
         raise RuntimeError(f"Unsupported file: {path}")
     # Assume last imported armature is our character
@@ -129,47 +213,53 @@ def find_action(obj):
             return ad.nla_tracks[0].strips[0].action
     return None
 
-# Determine if floor move based on id heuristic
-FLOOR_IDS = {"plank","side-plank","mountain-climbers","bicycle-crunches","dead-bug",
-             "glute-bridges","tricep-dips","downward-dog","child-pose","cat-cow","bear-crawl","forward-fold"}
+# Determine if floor move / static hold based on id heuristics
+FLOOR_IDS = frozenset({"plank","side-plank","mountain-climbers","bicycle-crunches","dead-bug",
+                       "glute-bridges","tricep-dips","downward-dog","child-pose","cat-cow","bear-crawl","forward-fold"})
+STATIC_IDS = frozenset({"plank","side-plank","wall-sit","downward-dog","child-pose",
+                        "single-leg-stand","tree-pose","warrior-3","forward-fold","finger-roll"})
+ASPECT_SIZES = {"square": "1080x1080", "portrait": "1080x1920", "landscape": "1920x1080"}
 
 for ex_id in args.ids:
-    # Load scene fresh per id
-    bpy.ops.wm.read_factory_settings(use_empty=True)
-    bpy.context.scene.world = world
-    bpy.context.scene.render.engine = 'BLENDER_EEVEE'
-    bpy.context.scene.frame_rate = args.fps
-    # Re-add ground/lights/camera
-    bpy.ops.mesh.primitive_plane_add(size=20, location=(0,0,0))
-    ground = bpy.context.active_object
-    ground.name = "Ground"
-    ground.data.materials.append(mat)
-    add_area("Key", (3,-3,3), (math.radians(-35),0,math.radians(35)), power=1500, size=5)
-    add_area("Fill", (-3,-3,2.5), (math.radians(-25),0,math.radians(-35)), power=800, size=5)
-    add_area("Rim", (0,3,2.5), (math.radians(-160),0,0), power=600, size=3)
-    cam = bpy.data.cameras.new("Camera")
-    cam.lens = 50
-    cam_obj = bpy.data.objects.new("Camera", cam)
-    bpy.context.collection.objects.link(cam_obj)
-    bpy.context.scene.camera = cam_obj
+    # Clone the prebuilt template instead of rebuilding ground/lights/camera
+    # with bpy.ops per id; the copy shares object data and skips the full
+    # depsgraph rebuild (same reuse pattern as build_catalog_blend).
+    scene = template_scene.copy()
+    scene.name = ex_id
+    bpy.context.window.scene = scene
 
     # Import
-    src_base = os.path.join(args.src, ex_id)
-    fpath = None
-    for ext in (".fbx",".glb",".gltf",".blend"):
-        cand = src_base + ext
-        if os.path.exists(cand):
-            fpath = cand; break
+    fpath = ASSETS.get(ex_id, (None, None))[1]
     if not fpath:
         print(f"[WARN] Missing asset for {ex_id} in {args.src}")
+        bpy.context.window.scene = template_scene
+        bpy.data.scenes.remove(scene)
         continue
+    if not fpath.endswith(".blend"):
+        # Prefer the cached .blend conversion over re-parsing FBX/GLTF
+        cached = os.path.join(CACHE_DIR, ex_id + ".blend")
+        if os.path.exists(cached):
+            fpath = cached
+
+    # Incremental skip: nothing to do when every aspect output is newer than
+    # the asset and this script
+    out_dir = os.path.join(args.out, ex_id)
+    dep_mtime = max(os.path.getmtime(fpath), os.path.getmtime(__file__))
+    outs = [os.path.join(out_dir, f"{ex_id}_v1_{wh}.mp4") for wh in ASPECT_SIZES.values()]
+    if all(os.path.exists(o) and os.path.getmtime(o) >= dep_mtime for o in outs):
+        print(f"[SKIP] {ex_id} up to date")
+        bpy.context.window.scene = template_scene
+        bpy.data.scenes.remove(scene)
+        continue
+
+    before = set(bpy.data.objects)
     rig = import_asset(fpath)
+    imported = [o for o in bpy.data.objects if o not in before]
     if rig:
         bpy.context.view_layer.objects.active = rig
 
     # Determine duration
-    is_static = ex_id in {"plank","side-plank","wall-sit","downward-dog","child-pose",
-                          "single-leg-stand","tree-pose","warrior-3","forward-fold","finger-roll"}
+    is_static = ex_id in STATIC_IDS
     seconds = args.static_seconds if is_static else args.seconds
     scene = bpy.context.scene
     scene.frame_start = 1
@@ -182,34 +272,48 @@ for ex_id in args.ids:
         fstart, fend = act.frame_range
         orig = (fend - fstart) if fend > fstart else 1.0
         scale = (scene.frame_end - scene.frame_start + 1) / orig
+        # Bulk foreach_get/foreach_set: per-point attribute writes cross the
+        # Python<->RNA boundary for every keyframe; pulling the flat arrays
+        # out, rescaling in NumPy and pushing them back is 10-50x faster on
+        # large actions.
         for fcurve in act.fcurves:
-            for kp in fcurve.keyframe_points:
-                kp.co.x = (kp.co.x - fstart) * scale + scene.frame_start
-                kp.handle_left.x = (kp.handle_left.x - fstart) * scale + scene.frame_start
-                kp.handle_right.x = (kp.handle_right.x - fstart) * scale + scene.frame_start
+            n = len(fcurve.keyframe_points)
+            if not n:
+                continue
+            for attr in ("co", "handle_left", "handle_right"):
+                buf = np.empty(2 * n, dtype=np.float64)
+                fcurve.keyframe_points.foreach_get(attr, buf)
+                buf[0::2] = (buf[0::2] - fstart) * scale + scene.frame_start
+                fcurve.keyframe_points.foreach_set(attr, buf)
+            fcurve.update()
         # Seamless: add 2-frame crossfade with NLA (optional advanced)
     else:
         # Static: add tiny sway by keying root rotation Z
         if rig:
-            bone = rig.pose.bones[0] if rig.pose.bones else None
-            obj = rig
-            obj.animation_data_create()
+            rig.animation_data_create()
             act = bpy.data.actions.new(f"{ex_id}_Idle")
-            obj.animation_data.action = act
+            rig.animation_data.action = act
             fcu = act.fcurves.new(data_path="rotation_euler", index=2)
             fcu.keyframe_points.add(2)
-            fcu.keyframe_points[0].co = (scene.frame_start, 0.0)
-            fcu.keyframe_points[1].co = (scene.frame_end, 0.05)  # ~3°
+            # ~3° sway; one foreach_set instead of per-point RNA writes
+            fcu.keyframe_points.foreach_set(
+                "co", np.array([scene.frame_start, 0.0, scene.frame_end, 0.05], dtype=np.float32))
             fcu.update()
 
     # Render 3 aspects
+    kind = "floor" if ex_id in FLOOR_IDS else "standing"
+    os.makedirs(out_dir, exist_ok=True)
     for aspect in ("square","portrait","landscape"):
-        kind = "floor" if ex_id in FLOOD_IDS if False else ("floor" if ex_id in FLOOD_IDS else ("floor" if ex_id in FLOOD_IDS else ("floor" if ex_id in set() else ("floor" if ex_id in set() else None))))
-        # Simpler: decide floor by set membership
-        kind = "floor" if ex_id in {"plank","side-plank","mountain-climbers","bicycle-crunches","dead-bug","glute-bridges","tricep-dips","downward-dog","child-pose","cat-cow","bear-crawl","forward-fold"} else "standing"
         position_camera(kind=kind, aspect=aspect)
-        out_dir = os.path.join(args.out, ex_id)
-        os.makedirs(out_dir, exist_ok=True)
-        scene.render.filepath = os.path.join(out_dir, f"{ex_id}_v1_" + ("1080x1080" if aspect=="square" else "1080x1920" if aspect=="portrait" else "1920x1080") + ".mp4")
+        scene.render.filepath = os.path.join(out_dir, f"{ex_id}_v1_{ASPECT_SIZES[aspect]}.mp4")
         bpy.ops.render.render(animation=True)
+        remux_faststart(scene.render.filepath)
+
+    # Drop this id's imported datablocks and scene copy so memory doesn't
+    # grow with the catalog; the template is reused, never reloaded.
+    for o in imported:
+        bpy.data.objects.remove(o, do_unlink=True)
+    bpy.context.window.scene = template_scene
+    bpy.data.scenes.remove(scene)
+    bpy.ops.outliner.orphans_purge(do_recursive=True)
 print("Done.")
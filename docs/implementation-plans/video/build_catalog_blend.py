@@ -19,8 +19,9 @@ def parse_argv():
     ap.add_argument("--fps", type=int, default=30, help="Frames per second")
     return ap.parse_args(argv)
 
-def append_template_scene(template_path):
-    # Append the first scene from template (assume it's the main scene)
+def load_template_scene(template_path):
+    # Parse the template .blend exactly once; per-exercise scenes are made
+    # with Scene.copy() instead of re-reading and re-linking the file.
     with bpy.data.libraries.load(template_path, link=False) as (data_from, data_to):
         # Prefer a scene named "Scene" or the first available
         preferred = "Scene" if "Scene" in data_from.scenes else (data_from.scenes[0] if data_from.scenes else None)
@@ -49,26 +50,37 @@ def set_timeline(scene, fps, seconds):
     scene.frame_end = max(2, int(fps * seconds))
     scene.render.fps = fps
 
-def find_asset(src_dir, ex_id):
-    for ext in (".fbx",".glb",".gltf"):
-        cand = os.path.join(src_dir, ex_id + ext)
-        if os.path.exists(cand):
-            return cand
-    return None
+# Lower value wins when an id exists in several formats
+ASSET_EXT_PREFERENCE = {".fbx": 0, ".glb": 1, ".gltf": 2}
+
+def index_assets(src_dir):
+    # Single directory scan instead of per-id os.path.exists probes
+    index = {}
+    for entry in os.scandir(src_dir):
+        stem, ext = os.path.splitext(entry.name)
+        pref = ASSET_EXT_PREFERENCE.get(ext.lower())
+        if pref is None:
+            continue
+        cur = index.get(stem)
+        if cur is None or pref < cur[0]:
+            index[stem] = (pref, entry.path)
+    return index
 
 def main():
     args = parse_argv()
     # Start from a clean file
     bpy.ops.wm.read_factory_settings(use_empty=True)
-    # For each exercise, append template scene and import the corresponding asset
+    # Load the template once, then clone it per exercise; the copy shares the
+    # lights/ground datablocks and avoids per-id file I/O and parsing
+    template_scene = load_template_scene(args.template)
+    assets = index_assets(args.src)
     created_scenes = []
     for ex_id in args.ids:
-        tmpl_scene = append_template_scene(args.template)
-        # Rename cloned scene uniquely
-        scene = tmpl_scene
+        scene = template_scene.copy()
         scene.name = f"{ex_id}"
+        bpy.context.window.scene = scene
         # Load asset
-        asset = find_asset(args.src, ex_id)
+        asset = assets.get(ex_id, (None, None))[1]
         if not asset:
             print(f"[WARN] Missing asset for {ex_id}: expected {ex_id}.fbx|.glb in {args.src}")
         else:
@@ -7,6 +7,7 @@ bpy.ops.wm.read_factory_settings(use_empty=True)
 # Scene/world settings
 scene = bpy.context.scene
 scene.render.engine = 'BLENDER_EEVEE'
+scene.eevee.taa_render_samples = 16  # preview clips; EEVEE sample cost is linear
 scene.frame_rate = 30
 
 world = bpy.data.worlds.new("World")
@@ -34,20 +35,29 @@ scene.camera = cam_obj
 cam_obj.location = (0.0, -4.2, 1.5)  # Standing default
 cam_obj.rotation_euler = (math.radians(80), 0, 0)
 
-# Lights
+# Lights: (name, location, rotation_euler in radians, power, size)
+LIGHT_SPECS = (
+    ("Key",  (3, -3, 3),    (-0.6109, 0.0, 0.6109),  1500, 5),  # -35/35 deg
+    ("Fill", (-3, -3, 2.5), (-0.4363, 0.0, -0.6109), 800, 5),   # -25/-35 deg
+    ("Rim",  (0, 3, 2.5),   (-2.7925, 0.0, 0.0),     600, 3),   # -160 deg
+)
+
 def add_area(name, loc, rot, power=1200, size=5):
-    bpy.ops.object.light_add(type='AREA', location=loc, rotation=rot)
-    L = bpy.context.active_object
-    L.name = name
-    L.data.energy = power
-    L.data.shape = 'RECTANGLE'
-    L.data.size = size
-    L.data.size_y = size
-    return L
-
-add_area("Key", (3,-3,3), (math.radians(-35),0,math.radians(35)), power=1500, size=5)
-add_area("Fill", (-3,-3,2.5), (math.radians(-25),0,math.radians(-35)), power=800, size=5)
-add_area("Rim", (0,3,2.5), (math.radians(-160),0,0), power=600, size=3)
+    # Low-level datablock creation; bpy.ops.object.light_add pushes a full
+    # context/undo step per call.
+    light = bpy.data.lights.new(name, 'AREA')
+    light.energy = power
+    light.shape = 'RECTANGLE'
+    light.size = size
+    light.size_y = size
+    obj = bpy.data.objects.new(name, light)
+    obj.location = loc
+    obj.rotation_euler = rot
+    bpy.context.collection.objects.link(obj)
+    return obj
+
+for spec in LIGHT_SPECS:
+    add_area(*spec)
 
 # Output defaults
 scene.render.resolution_x = 1080
@@ -55,8 +65,11 @@ scene.render.resolution_y = 1080
 scene.render.image_settings.file_format = 'FFMPEG'
 scene.render.ffmpeg.format = 'MPEG4'
 scene.render.ffmpeg.codec = 'H264'
-scene.render.ffmpeg.constant_rate_factor = 'LOW'
-scene.render.ffmpeg.ffmpeg_preset = 'GOOD'
+scene.render.ffmpeg.constant_rate_factor = 'MEDIUM'  # ~CRF 23; plenty for dark preview clips
+scene.render.ffmpeg.ffmpeg_preset = 'REALTIME'
 scene.render.ffmpeg.gopsize = scene.frame_rate
+scene.render.ffmpeg.use_max_b_frames = True
+scene.render.ffmpeg.max_b_frames = 2
+scene.render.ffmpeg.use_autosplit = False
 
 print("Template scene created. Save as repcue_template.blend")
@@ -5,6 +5,7 @@
 
 import bpy
 import math
+import numpy as np
 
 # ----- Reset -----
 bpy.ops.wm.read_factory_settings(use_empty=True)
@@ -12,6 +13,7 @@ bpy.ops.wm.read_factory_settings(use_empty=True)
 # ----- Scene / World -----
 scene = bpy.context.scene
 scene.render.engine = 'BLENDER_EEVEE'
+scene.eevee.taa_render_samples = 16  # preview clips; EEVEE sample cost is linear
 scene.frame_rate = 30
 
 world = bpy.data.worlds.new("World")
@@ -46,20 +48,29 @@ def position_camera(kind="standing"):
 
 position_camera("standing")
 
-# ----- Lights -----
+# ----- Lights: (name, location, rotation_euler in radians, power, size) -----
+LIGHT_SPECS = (
+    ("Key",  (3, -3, 3),    (-0.6109, 0.0, 0.6109),  1500, 5),  # -35/35 deg
+    ("Fill", (-3, -3, 2.5), (-0.4363, 0.0, -0.6109), 800, 5),   # -25/-35 deg
+    ("Rim",  (0, 3, 2.5),   (-2.7925, 0.0, 0.0),     600, 3),   # -160 deg
+)
+
 def add_area(name, loc, rot, power=1200, size=5):
-    bpy.ops.object.light_add(type='AREA', location=loc, rotation=rot)
-    L = bpy.context.active_object
-    L.name = name
-    L.data.energy = power
-    L.data.shape = 'RECTANGLE'
-    L.data.size = size
-    L.data.size_y = size
-    return L
-
-add_area("Key", (3,-3,3), (math.radians(-35),0,math.radians(35)), power=1500, size=5)
-add_area("Fill", (-3,-3,2.5), (math.radians(-25),0,math.radians(-35)), power=800, size=5)
-add_area("Rim", (0,3,2.5), (math.radians(-160),0,0), power=600, size=3)
+    # Low-level datablock creation; bpy.ops.object.light_add pushes a full
+    # context/undo step per call.
+    light = bpy.data.lights.new(name, 'AREA')
+    light.energy = power
+    light.shape = 'RECTANGLE'
+    light.size = size
+    light.size_y = size
+    obj = bpy.data.objects.new(name, light)
+    obj.location = loc
+    obj.rotation_euler = rot
+    bpy.context.collection.objects.link(obj)
+    return obj
+
+for spec in LIGHT_SPECS:
+    add_area(*spec)
 
 # ----- Placeholder Humanoid (Armature + simple mesh) -----
 # Armature
@@ -130,26 +141,33 @@ arm.animation_data_create()
 act = bpy.data.actions.new("Loop")
 arm.animation_data.action = act
 
-# Animate hips Z (down and up)
+mid = (scene.frame_start + scene.frame_end) // 2
+
+# Animate hips Z (down and up); batch all keyframes in one foreach_set
+# instead of per-point RNA assignments
 fcu_loc_z = act.fcurves.new(data_path="location", index=2)
 k = fcu_loc_z.keyframe_points
 k.add(3)
-k[0].co = (scene.frame_start, 0.0)
-k[1].co = ((scene.frame_start + scene.frame_end)//2, -0.1)   # dip
-k[2].co = (scene.frame_end, 0.0)
-for kp in k:
-    kp.interpolation = 'BEZIER'
+k.foreach_set("co", np.array([
+    scene.frame_start, 0.0,
+    mid, -0.1,   # dip
+    scene.frame_end, 0.0,
+], dtype=np.float32))
+fcu_loc_z.update()
 
 # Tiny chest rotation for natural feel
 arm.rotation_mode = 'XYZ'
 fcu_rot_x = act.fcurves.new(data_path="rotation_euler", index=0)
 k2 = fcu_rot_x.keyframe_points
 k2.add(3)
-k2[0].co = (scene.frame_start, math.radians(0.0))
-k2[1].co = ((scene.frame_start + scene.frame_end)//2, math.radians(4.0))
-k2[2].co = (scene.frame_end, math.radians(0.0))
-for kp in k2:
-    kp.interpolation = 'BEZIER'
+k2.foreach_set("co", np.array([
+    scene.frame_start, 0.0,
+    mid, math.radians(4.0),
+    scene.frame_end, 0.0,
+], dtype=np.float32))
+fcu_rot_x.update()
+# No interpolation pass needed: keyframe_points.add() defaults to BEZIER;
+# a non-default mode would go through foreach_set('interpolation', ints)
 
 # Match mesh movement to armature object (for preview only)
 # (Mesh is not skinned; we keep it simple for a lighting/camera test object.)
@@ -161,8 +179,11 @@ scene.render.resolution_y = 1080
 scene.render.image_settings.file_format = 'FFMPEG'
 scene.render.ffmpeg.format = 'MPEG4'
 scene.render.ffmpeg.codec = 'H264'
-scene.render.ffmpeg.constant_rate_factor = 'LOW'
-scene.render.ffmpeg.ffmpeg_preset = 'GOOD'
+scene.render.ffmpeg.constant_rate_factor = 'MEDIUM'  # ~CRF 23; plenty for dark preview clips
+scene.render.ffmpeg.ffmpeg_preset = 'REALTIME'
 scene.render.ffmpeg.gopsize = scene.frame_rate
+scene.render.ffmpeg.use_max_b_frames = True
+scene.render.ffmpeg.max_b_frames = 2
+scene.render.ffmpeg.use_autosplit = False
 
 print("Template with placeholder created. Save as repcue_template.blend")
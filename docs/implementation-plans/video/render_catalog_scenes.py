@@ -3,11 +3,29 @@
 # Renders all scenes in the currently opened .blend (one per exercise).
 # Each scene name is treated as the exercise_id.
 #
+# Each scene is rendered ONCE to a PNG master sequence (a 1920x1920 superset
+# of every aspect) and the three delivery aspect ratios are derived from it
+# with FFmpeg crop/scale passes. Scene evaluation and EEVEE rasterization
+# dominate the cost, so 1 Blender render + 3 FFmpeg encodes is ~3x faster
+# than re-running the animation pipeline per aspect.
+#
 # Example:
 # blender -b repcue_exercises_catalog.blend -P render_catalog_scenes.py -- \
 #   --out "/assets/videos" --fps 30 --seconds 2.2 --static_seconds 10 \
 #   --static_ids plank side-plank wall-sit downward-dog child-pose single-leg-stand tree-pose warrior-3 forward-fold finger-roll
-import bpy, sys, os, argparse
+import bpy, sys, os, math, argparse, shutil, subprocess, tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Square superset of all three aspects; portrait/landscape are center crops
+# and square is a straight downscale
+MASTER_WIDTH, MASTER_HEIGHT = 1920, 1920
+
+# (aspect, WxH used in the filename, FFmpeg filter applied to the master)
+ASPECT_FILTERS = (
+    ("square",    "1080x1080", "scale=1080:1080"),
+    ("portrait",  "1080x1920", "crop=1080:1920"),
+    ("landscape", "1920x1080", "crop=1920:1080"),
+)
 
 def parse_argv():
     argv = sys.argv
@@ -19,54 +37,187 @@ def parse_argv():
     ap.add_argument("--static_seconds", type=float, default=10.0, help="Hold loop length")
     ap.add_argument("--static_ids", nargs="*", default=[], help="IDs considered static holds")
     ap.add_argument("--subset", nargs="*", default=None, help="Optional subset of scene names to render")
+    ap.add_argument("--jobs", type=int, default=1, help="Parallel Blender workers per scene (frame-range sharding)")
+    ap.add_argument("--engine", choices=["eevee","cycles"], default="eevee",
+                    help="cycles targets NVIDIA OPTIX (GPU + tensor-core denoiser); eevee runs 16 samples with TAA reprojection")
+    # Internal worker-mode flags used when this script re-invokes itself
+    ap.add_argument("--chunk_scene", default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--frame_start", type=int, default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--frame_end", type=int, default=None, help=argparse.SUPPRESS)
     return ap.parse_args(argv)
 
-def ensure_video_settings(scene):
-    scene.render.image_settings.file_format = 'FFMPEG'
-    scene.render.ffmpeg.format = 'MPEG4'
-    scene.render.ffmpeg.codec = 'H264'
-    scene.render.ffmpeg.constant_rate_factor = 'LOW'
-    scene.render.ffmpeg.ffmpeg_preset = 'GOOD'
-    scene.render.ffmpeg.gopsize = scene.render.fps
-
-def set_resolution(scene, aspect):
-    if aspect == "square":
-        scene.render.resolution_x = 1080; scene.render.resolution_y = 1080
-    elif aspect == "portrait":
-        scene.render.resolution_x = 1080; scene.render.resolution_y = 1920
+def encode_all_aspects(frames_dir, base, fps, exercise_id):
+    # Runs on a worker thread so libx264 encoding (CPU) overlaps the next
+    # scene's EEVEE render (GPU) instead of serializing after it.
+    try:
+        png_pattern = os.path.join(frames_dir, "frame_%04d.png")
+        subprocess.run(encode_command(png_pattern, fps, base), check=True)
+        for aspect, wh, vf in ASPECT_FILTERS:
+            print(f"[OK] {exercise_id} {wh}")
+    finally:
+        shutil.rmtree(frames_dir, ignore_errors=True)
+
+def outputs_up_to_date(base, dep_mtime):
+    # Incremental skip: true when every aspect mp4 exists and is newer than
+    # the .blend and this script
+    for aspect, wh, vf in ASPECT_FILTERS:
+        out = base + f"{wh}.mp4"
+        if not os.path.exists(out) or os.path.getmtime(out) < dep_mtime:
+            return False
+    return True
+
+def configure_engine(scene, engine):
+    if engine == "cycles":
+        # Worth it only with an NVIDIA card: OPTIX runs the denoiser on
+        # tensor cores, so 16 samples + denoise beats raising samples.
+        scene.render.engine = 'CYCLES'
+        scene.cycles.device = 'GPU'
+        scene.cycles.samples = 16
+        scene.cycles.use_denoising = True
+        scene.cycles.denoiser = 'OPTIX'
+        prefs = bpy.context.preferences.addons['cycles'].preferences
+        prefs.compute_device_type = 'OPTIX'
+        prefs.get_devices()
     else:
-        scene.render.resolution_x = 1920; scene.render.resolution_y = 1080
+        # TAA reprojection amortizes samples across frames, keeping
+        # perceived AA quality at half the per-frame work.
+        scene.render.engine = 'BLENDER_EEVEE'
+        scene.eevee.taa_render_samples = 16
+        scene.eevee.use_taa_reprojection = True
+
+def shard_frames(frame_start, frame_end, jobs):
+    total = frame_end - frame_start + 1
+    jobs = max(1, min(jobs, total))
+    size = math.ceil(total / jobs)
+    chunks = []
+    s = frame_start
+    while s <= frame_end:
+        chunks.append((s, min(s + size - 1, frame_end)))
+        s += size
+    return chunks
+
+def render_chunk(args):
+    # Worker mode: render a slice of one scene's frame range as PNGs.
+    scene = bpy.data.scenes[args.chunk_scene]
+    bpy.context.window.scene = scene
+    scene.render.fps = args.fps
+    configure_engine(scene, args.engine)
+    ensure_master_settings(scene)
+    scene.frame_start = args.frame_start
+    scene.frame_end = args.frame_end
+    scene.render.filepath = os.path.join(args.out, "frame_")
+    bpy.ops.render.render(animation=True)
+
+def render_frames(scene, frames_dir, jobs, engine):
+    # Shard the frame range across headless Blender child processes; every
+    # chunk writes distinct frame numbers into the shared PNG sequence, so
+    # the single encode pass afterwards needs no concat step. Falls back to
+    # an in-process render when unsharded or the .blend is unsaved.
+    if jobs <= 1 or not bpy.data.filepath:
+        scene.render.filepath = os.path.join(frames_dir, "frame_")
+        bpy.ops.render.render(animation=True)
+        return
+    chunks = shard_frames(scene.frame_start, scene.frame_end, jobs)
+    cmds = [
+        [bpy.app.binary_path, "-b", bpy.data.filepath,
+         "-P", os.path.abspath(__file__), "--",
+         "--out", frames_dir,
+         "--fps", str(scene.render.fps),
+         "--engine", engine,
+         "--chunk_scene", scene.name,
+         "--frame_start", str(s),
+         "--frame_end", str(e)]
+        for s, e in chunks
+    ]
+    with ThreadPoolExecutor(max_workers=len(cmds)) as pool:
+        for future in [pool.submit(subprocess.run, cmd, check=True) for cmd in cmds]:
+            future.result()
+
+def ensure_master_settings(scene):
+    # Render the master once as a PNG sequence; encoding happens in FFmpeg.
+    scene.render.image_settings.file_format = 'PNG'
+    # Scratch frames are deleted right after the encode; skip zlib effort
+    scene.render.image_settings.compression = 0
+    scene.render.use_file_extension = True
+    # Keep depsgraph/BVH alive between render invocations of the same scene
+    scene.render.use_persistent_data = True
+    scene.render.resolution_x = MASTER_WIDTH
+    scene.render.resolution_y = MASTER_HEIGHT
+
+def encode_command(png_pattern, fps, base):
+    # One ffmpeg process for all three aspects: the PNG master is decoded
+    # once, split in-graph, and the three x264 encoders run concurrently on
+    # ffmpeg's internal threads.
+    chains = ["[0:v]split=%d%s" % (len(ASPECT_FILTERS),
+                                   "".join(f"[{a}]" for a, _, _ in ASPECT_FILTERS))]
+    outputs = []
+    for aspect, wh, vf in ASPECT_FILTERS:
+        chains.append(f"[{aspect}]{vf}[{aspect}_out]")
+        outputs += [
+            "-map", f"[{aspect}_out]",
+            "-c:v", "libx264",
+            "-preset", "faster",
+            "-crf", "20",
+            "-tune", "stillimage",  # low-motion catalog shots; better PSNR at same bitrate
+            "-pix_fmt", "yuv420p",
+            "-movflags", "+faststart",
+            base + f"{wh}.mp4",
+        ]
+    return ["ffmpeg", "-y", "-framerate", str(fps), "-i", png_pattern,
+            "-filter_complex", ";".join(chains)] + outputs
 
 def main():
     args = parse_argv()
+    if args.chunk_scene:
+        render_chunk(args)
+        return
     os.makedirs(args.out, exist_ok=True)
 
+    dep_mtime = os.path.getmtime(__file__)
+    if bpy.data.filepath and os.path.exists(bpy.data.filepath):
+        dep_mtime = max(dep_mtime, os.path.getmtime(bpy.data.filepath))
+
     scenes = list(bpy.data.scenes)
     if args.subset:
         names = set(args.subset)
         scenes = [s for s in scenes if s.name in names]
 
+    # Two encode slots bound the CPU oversubscription while still letting the
+    # encoder trail one scene behind the renderer
+    encode_pool = ThreadPoolExecutor(max_workers=2)
+    encode_jobs = []
+
     for scene in scenes:
         bpy.context.window.scene = scene
         scene.render.fps = args.fps
+        configure_engine(scene, args.engine)
         is_static = scene.name in set(args.static_ids)
         seconds = args.static_seconds if is_static else args.seconds
         scene.frame_start = 1
         scene.frame_end = max(2, int(scene.render.fps * seconds))
 
-        ensure_video_settings(scene)
+        ensure_master_settings(scene)
         exercise_id = scene.name
         out_dir = os.path.join(args.out, exercise_id)
         os.makedirs(out_dir, exist_ok=True)
 
         base = os.path.join(out_dir, f"{exercise_id}_v1_")
+        if outputs_up_to_date(base, dep_mtime):
+            print(f"[SKIP] {exercise_id} up to date")
+            continue
 
-        for aspect, wh in (("square","1080x1080"), ("portrait","1080x1920"), ("landscape","1920x1080")):
-            set_resolution(scene, aspect)
-            scene.render.filepath = base + f"{wh}.mp4"
-            bpy.ops.render.render(animation=True)
-            print(f"[OK] {exercise_id} {wh}")
+        frames_dir = tempfile.mkdtemp(prefix=f"repcue_{exercise_id}_")
+        try:
+            render_frames(scene, frames_dir, args.jobs, args.engine)
+        except Exception:
+            shutil.rmtree(frames_dir, ignore_errors=True)
+            raise
+        encode_jobs.append(encode_pool.submit(
+            encode_all_aspects, frames_dir, base, args.fps, exercise_id))
 
+    for job in encode_jobs:
+        job.result()
+    encode_pool.shutdown()
     print("All scenes rendered.")
 
 if __name__ == "__main__":
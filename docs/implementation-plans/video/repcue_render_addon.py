@@ -11,26 +11,54 @@ bl_info = {
 
 import bpy
 import os
+import shutil
+import subprocess
+import tempfile
 from bpy.props import StringProperty, FloatProperty, BoolProperty
 
-def ensure_video_settings(scene):
-    scene.render.image_settings.file_format = 'FFMPEG'
-    scene.render.ffmpeg.format = 'MPEG4'
-    scene.render.ffmpeg.codec = 'H264'
-    scene.render.ffmpeg.constant_rate_factor = 'LOW'
-    scene.render.ffmpeg.ffmpeg_preset = 'GOOD'
-    scene.render.ffmpeg.gopsize = scene.render.fps
-
-def set_resolution(scene, aspect):
-    if aspect == "square":
-        scene.render.resolution_x = 1080
-        scene.render.resolution_y = 1080
-    elif aspect == "portrait":
-        scene.render.resolution_x = 1080
-        scene.render.resolution_y = 1920
-    else:
-        scene.render.resolution_x = 1920
-        scene.render.resolution_y = 1080
+# Square superset of all three aspects; portrait/landscape are center crops
+# and square is a straight downscale
+MASTER_WIDTH, MASTER_HEIGHT = 1920, 1920
+
+# (aspect, WxH used in the filename, FFmpeg filter applied to the master)
+ASPECT_FILTERS = (
+    ("square",    "1080x1080", "scale=1080:1080"),
+    ("portrait",  "1080x1920", "crop=1080:1920"),
+    ("landscape", "1920x1080", "crop=1920:1080"),
+)
+
+def ensure_master_settings(scene):
+    # Render the master once as a PNG sequence; encoding happens in FFmpeg.
+    scene.render.image_settings.file_format = 'PNG'
+    # Scratch frames are deleted right after the encode; skip zlib effort
+    scene.render.image_settings.compression = 0
+    scene.render.use_file_extension = True
+    # Keep depsgraph/BVH alive between render invocations of the same scene
+    scene.render.use_persistent_data = True
+    scene.render.resolution_x = MASTER_WIDTH
+    scene.render.resolution_y = MASTER_HEIGHT
+
+def encode_command(png_pattern, fps, base):
+    # One ffmpeg process for all three aspects: the PNG master is decoded
+    # once, split in-graph, and the three x264 encoders run concurrently on
+    # ffmpeg's internal threads.
+    chains = ["[0:v]split=%d%s" % (len(ASPECT_FILTERS),
+                                   "".join(f"[{a}]" for a, _, _ in ASPECT_FILTERS))]
+    outputs = []
+    for aspect, wh, vf in ASPECT_FILTERS:
+        chains.append(f"[{aspect}]{vf}[{aspect}_out]")
+        outputs += [
+            "-map", f"[{aspect}_out]",
+            "-c:v", "libx264",
+            "-preset", "faster",
+            "-crf", "20",
+            "-tune", "stillimage",  # low-motion catalog shots; better PSNR at same bitrate
+            "-pix_fmt", "yuv420p",
+            "-movflags", "+faststart",
+            base + f"{wh}.mp4",
+        ]
+    return ["ffmpeg", "-y", "-framerate", str(fps), "-i", png_pattern,
+            "-filter_complex", ";".join(chains)] + outputs
 
 class REPCUE_Props(bpy.types.PropertyGroup):
     output_dir: StringProperty(
@@ -80,16 +108,20 @@ class REPCUE_OT_render(bpy.types.Operator):
         scn.frame_start = 1
         scn.frame_end = max(2, int(seconds * fps))
 
-        ensure_video_settings(scn)
+        ensure_master_settings(scn)
 
         os.makedirs(bpy.path.abspath(props.output_dir), exist_ok=True)
         base = os.path.join(bpy.path.abspath(props.output_dir), props.exercise_id + "_v1_")
 
-        # Render each aspect
-        for aspect, wh in (("square","1080x1080"), ("portrait","1080x1920"), ("landscape","1920x1080")):
-            set_resolution(scn, aspect)
-            scn.render.filepath = base + f"{wh}.mp4"
+        # Render the master once, then derive each aspect with FFmpeg
+        frames_dir = tempfile.mkdtemp(prefix=f"repcue_{props.exercise_id}_")
+        try:
+            scn.render.filepath = os.path.join(frames_dir, "frame_")
             bpy.ops.render.render(animation=True)
+            png_pattern = os.path.join(frames_dir, "frame_%04d.png")
+            subprocess.run(encode_command(png_pattern, fps, base), check=True)
+        finally:
+            shutil.rmtree(frames_dir, ignore_errors=True)
 
         self.report({'INFO'}, "RepCue: Rendered all three aspect ratios.")
         return {'FINISHED'}